@@ -1,9 +1,23 @@
-import string
 import random
-import re
+import string
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
 from auto_complete_data import AutoCompleteData
-from collections import defaultdict
-from typing import List, Tuple, Optional
+from process_data import WORD_RE, split_words
+from sentence_matcher import SentenceMatcher
+from trie_index import TrieIndex, TrieNode
+from typing import Iterator, List, Sequence, Tuple, Optional, Union
+
+
+class MultipleMismatches:
+    """
+    The type of MULTIPLE_MISMATCHES, returned by AutoComplete._scan_mismatch when more
+    than one word is not in the dataset.
+    """
+
+
+MULTIPLE_MISMATCHES = MultipleMismatches()
 
 
 class AutoComplete:
@@ -14,42 +28,129 @@ class AutoComplete:
     input queries and matching them against a processed dataset.
     """
 
-    def __init__(self, ht: defaultdict):
+    def __init__(self, ht: TrieIndex):
         """
         Initializes the AutoComplete instance with processed data.
 
         Parameters:
-            ht (defaultdict): A dictionary containing substrings as keys and lists of
-                             tuples with sentence data as values.
+            ht (TrieIndex): An index containing word prefixes as keys and sorted lists of
+                            line ids into its line table as values.
         """
         self.ht = ht
-        self.__word_re = re.compile(r'\b[a-z]+\b')
 
-    def create_auto_complete(self, lines: List[Tuple[str, int, str]]) -> List[AutoCompleteData]:
+        # Completions are cached per normalized query, and the matching lines of the last
+        # query are kept so a query that extends it only has to filter them.
+        self.__cached_completion = lru_cache(maxsize=512)(self._find_best_k_completion)
+        self.__previous = None
+
+    def create_auto_complete(self, line_ids: Sequence[int]) -> List[AutoCompleteData]:
         """
-        Converts raw line data into AutoCompleteData instances.
+        Converts line ids into AutoCompleteData instances.
 
         Parameters:
-            lines (List[Tuple[str, int, str]]): A list of tuples containing sentence,
-                                                line number, and source filename.
+            line_ids (Sequence[int]): Line ids from the index's line table.
 
         Returns:
             List[AutoCompleteData]: A list of AutoCompleteData instances.
         """
-        responses = []
-        for i in range(len(lines)):
-            responses.append(
-                AutoCompleteData(
-                    lines[i][0],  # completed_sentence
-                    lines[i][2],  # source_text
-                    lines[i][1]  # offset
-                ))
-        return responses
+        line = self.ht.line
+        return [AutoCompleteData(sentence, filename, line_number)
+                for sentence, line_number, filename in map(line, line_ids)]
+
+    def _deletion_at(self, node: TrieNode, sentence: str, index: int) -> Optional[str]:
+        """
+        Checks if deleting the character at a position gives a sentence in the dataset.
+
+        Parameters:
+            node (TrieNode): The trie node reached by the characters before the position.
+            sentence (str): The input sentence.
+            index (int): The position of the character to delete.
+
+        Returns:
+            Optional[str]: The shortened sentence, or None if it is not in the dataset.
+        """
+        if self.ht.is_key(self.ht.descend(node, sentence, index + 1)):
+            return sentence[:index] + sentence[index + 1:]
+        return None
+
+    def _addition_at(self, node: TrieNode, sentence: str, index: int, char: str) -> Optional[str]:
+        """
+        Checks if adding a character at a position gives a sentence in the dataset.
+
+        Parameters:
+            node (TrieNode): The trie node reached by the characters before the position.
+            sentence (str): The input sentence.
+            index (int): The position at which the character is added.
+            char (str): The character to add.
+
+        Returns:
+            Optional[str]: The lengthened sentence, or None if it is not in the dataset.
+        """
+        child = node.children.get(char)
+        if child is not None and self.ht.is_key(self.ht.descend(child, sentence, index)):
+            return sentence[:index] + char + sentence[index:]
+        return None
+
+    def _replacements_at(self, node: TrieNode, sentence: str, index: int) -> Iterator[str]:
+        """
+        Yields the sentences in the dataset obtained by replacing the character at a position.
+
+        Parameters:
+            node (TrieNode): The trie node reached by the characters before the position.
+            sentence (str): The input sentence.
+            index (int): The position of the character to replace.
+
+        Returns:
+            Iterator[str]: The altered sentences, in alphabetical order of the new character.
+        """
+        children = node.children
+        current = sentence[index]
+        is_key, descend = self.ht.is_key, self.ht.descend
+        for char in string.ascii_lowercase:
+            child = children.get(char)
+            if child is not None and char != current and is_key(descend(child, sentence, index + 1)):
+                yield sentence[:index] + char + sentence[index + 1:]
+
+    def deletion_score(self, index: int, max_score: int) -> int:
+        """
+        Calculates the score for deleting a character based on its position.
+
+        Parameters:
+            index (int): The position of the deleted character.
+            max_score (int): The maximum possible score before penalty.
+
+        Returns:
+            int: The adjusted score after applying the penalty.
+        """
+        return max_score - max(10 - 2 * index, 2)  # Adjusts the score based on the position
+
+    @staticmethod
+    def _deletion_positions(sentence: str, path: List[TrieNode]) -> Iterator[int]:
+        """
+        Lists the positions worth trying to delete a character at, last position first.
+
+        Parameters:
+            sentence (str): The input sentence.
+            path (List[TrieNode]): The nodes reached by walking the sentence down the trie.
+
+        Returns:
+            Iterator[int]: The positions whose prefix exists in the trie.
+        """
+        for i in range(min(len(sentence), len(path)) - 1, -1, -1):
+            # Deleting any letter of a repeated run gives the same sentence, which is
+            # tried with a better score at the run's last letter.
+            if sentence[i + 1:i + 2] != sentence[i]:
+                yield i
 
     def delete_char(self, sentence: str) -> List[Tuple[str, int]]:
         """
         Generates possible sentences by deleting one character at each position.
 
+        Instead of building every shortened sentence, the trie is followed along the
+        sentence and, at each position, the rest of the sentence is followed while
+        skipping that position's character. A shortened sentence is only built once
+        it is known to be in the dataset.
+
         Parameters:
             sentence (str): The input sentence from which characters will be deleted.
 
@@ -58,13 +159,12 @@ class AutoComplete:
         """
         score = (len(sentence) - 1) * 2
         valid_sentences = []
+        path = self.ht.walk(sentence)
 
-        for i in range(len(sentence), -1, -1):
-            new_sentence = sentence[:i] + sentence[i + 1:]
-            if new_sentence in self.ht:
-                penalty = max(10 - 2 * i, 2)  # Adjusts the score based on the position
-                new_score = score - penalty
-                valid_sentences.append((new_sentence, new_score))
+        for i in self._deletion_positions(sentence, path):
+            new_sentence = self._deletion_at(path[i], sentence, i)
+            if new_sentence is not None:
+                valid_sentences.append((new_sentence, self.deletion_score(i, score)))
                 if len(valid_sentences) == 5:
                     break
 
@@ -84,10 +184,28 @@ class AutoComplete:
         penalties = [10, 8, 6, 4]
         return max_score - (penalties[index] if index < 4 else 2)
 
+    @staticmethod
+    def _addition_positions(sentence: str, path: List[TrieNode]) -> range:
+        """
+        Lists the positions worth trying to add a character at, last position first.
+
+        Parameters:
+            sentence (str): The input sentence.
+            path (List[TrieNode]): The nodes reached by walking the sentence down the trie.
+
+        Returns:
+            range: The positions whose prefix exists in the trie, up to the end of the sentence.
+        """
+        return range(min(len(sentence), len(path) - 1), -1, -1)
+
     def add_char(self, sentence: str) -> List[Tuple[str, int]]:
         """
         Generates possible sentences by adding one character at each position.
 
+        Only the characters that exist as children of the trie node reached so far
+        are tried, so no candidate is built unless it is in the dataset. Candidates are
+        listed by added letter, then from the last position to the first.
+
         Parameters:
             sentence (str): The input sentence to which characters will be added.
 
@@ -96,78 +214,85 @@ class AutoComplete:
         """
         n = len(sentence)
         res = []
-        for char in range(ord('a'), ord('z') + 1):
-            for i in range(n, -1, -1):
-                cur_word = sentence[:i] + chr(char) + sentence[i:]
-                if cur_word in self.ht:
-                    res.append((cur_word, self.addition_score(i, n * 2)))
+        path = self.ht.walk(sentence)
+        positions = self._addition_positions(sentence, path)
+
+        for char in string.ascii_lowercase:
+            for i in positions:
+                new_sentence = self._addition_at(path[i], sentence, i, char)
+                if new_sentence is not None:
+                    res.append((new_sentence, self.addition_score(i, n * 2)))
         return res
 
-    def has_multiple_mismatches(self, subtext: str) -> bool:
+    def _scan_mismatch(self, subtext: str) -> Optional[Union[Tuple[str, int, int], MultipleMismatches]]:
         """
-        Determines if the subtext contains more than one word not present in the dataset.
+        Finds the word of the subtext that is not present in the dataset in a single pass.
 
         Parameters:
             subtext (str): The input subtext to check for mismatches.
 
         Returns:
-            bool: True if there are multiple mismatched words, False otherwise.
+            Optional[Union[Tuple[str, int, int], MultipleMismatches]]: The mismatched word with its
+                start and end character indices, None if all the words are present, or
+                MULTIPLE_MISMATCHES if more than one word is missing.
+        """
+        ht = self.ht
+        mismatch = None
+        for match in WORD_RE.finditer(subtext):
+            if match.group() not in ht:
+                if mismatch is not None:  # We don't allow words with an error of more than one letter.
+                    return MULTIPLE_MISMATCHES
+                mismatch = (match.group(), match.start(), match.end())
+        return mismatch
+
+    def replacement_score(self, index: int, max_score: int) -> int:
         """
+        Calculates the score for replacing a character based on its position.
 
-        mismatches = 0
-        for word in subtext.split():
-            if word not in self.ht:
-                mismatches += 1
-                if mismatches > 1:  # We don't allow words with an error of more than one letter.
-                    return True
-        return False
+        Parameters:
+            index (int): The position of the replaced character.
+            max_score (int): The maximum possible score before penalty.
+
+        Returns:
+            int: The adjusted score after applying the penalty.
+        """
+        return max_score - (1 if index > 3 else 5 - index)
 
-    def find_mismatched_word_and_index(self, subtext: str) -> Optional[Tuple[str, int]]:
+    @staticmethod
+    def _replacement_positions(path: List[TrieNode], start_index: int, end_index: int) -> range:
         """
-        Identifies the first mismatched word in the subtext and its starting index.
+        Lists the positions of a mismatched word worth trying to replace, first position first.
 
         Parameters:
-            subtext (str): The input subtext to search for mismatches.
+            path (List[TrieNode]): The nodes reached by walking the subtext down the trie.
+            start_index (int): The index of the mismatched word's first character in the subtext.
+            end_index (int): The index just past the mismatched word's last character.
 
         Returns:
-            Optional[Tuple[str, int]]: A tuple containing the mismatched word and its index,
-                                       or None if no mismatches are found.
+            range: The positions of the word whose prefix exists in the trie.
         """
+        return range(start_index, min(end_index, len(path)))
 
-        for i, word in enumerate(subtext.split()):
-            if word not in self.ht:
-                return word, i
-        return None
-
-    def generate_possible_replacements(self, mismatched_word: str, subtext: str, end_word_index: int) -> List[Tuple[str, int]]:
+    def generate_possible_replacements(self, subtext: str, start_index: int, end_index: int) -> List[Tuple[str, int]]:
         """
         Generates possible replacements for a mismatched word by altering its characters.
 
         Parameters:
-            mismatched_word (str): The word identified as mismatched.
             subtext (str): The entire subtext containing the mismatched word.
-            end_word_index (int): The ending index of the mismatched word in the subtext.
+            start_index (int): The index of the mismatched word's first character in the subtext.
+            end_index (int): The index just past the mismatched word's last character.
 
         Returns:
             List[Tuple[str, int]]: A list of tuples containing possible replacement words and their scores.
         """
         # 2 points fot each suitable char.
         score = (len(subtext) - 1) * 2
-        alphabet = string.ascii_lowercase
         possible_words = []
+        path = self.ht.walk(subtext)
 
-        for i in range(len(mismatched_word), -1, -1):
-            for char in alphabet:
-                if char == subtext[end_word_index - i]:
-                    continue
-
-                new_word = subtext[:end_word_index - i] + char + subtext[end_word_index - i + 1:]
-                if new_word in self.ht:
-                    penalty = 1 if (end_word_index - i) > 3 else 5 - (end_word_index - i)
-                    new_score = score - penalty
-                    possible_words.append((new_word, new_score))
-                    if len(possible_words) == 5:
-                        break
+        for i in self._replacement_positions(path, start_index, end_index):
+            for new_word in self._replacements_at(path[i], subtext, i):
+                possible_words.append((new_word, self.replacement_score(i, score)))
 
         return possible_words
 
@@ -182,18 +307,27 @@ class AutoComplete:
             List[Tuple[str, int]]: A list of corrected subtexts and their scores.
         """
 
-        if self.has_multiple_mismatches(subtext):
+        mismatch = self._scan_mismatch(subtext)
+        if mismatch is None or mismatch is MULTIPLE_MISMATCHES:
             return []
 
-        mismatched_word, start_index = self.find_mismatched_word_and_index(subtext)
-
-        end_word_index = start_index + len(mismatched_word) - 1
-        return self.generate_possible_replacements(mismatched_word, subtext, end_word_index)
+        _, start_index, end_index = mismatch
+        return self.generate_possible_replacements(subtext, start_index, end_index)
 
     def get_best_completions(self, subtext: str) -> Optional[str]:
         """
         Combines various character manipulations to find the best autocomplete suggestion.
 
+        The score of a replacement, deletion or addition only depends on its kind and
+        position, so instead of collecting every candidate and scanning for the highest
+        score, the (kind, position) pairs are ranked by score first and tried in that
+        order along a single walk of the trie, over the same positions as replace_char,
+        delete_char and add_char. The first one giving a key in the dataset is the best.
+        Ties go to the candidate that comes first in the lists of those methods:
+        replacements, then deletions, then additions. Replacements are tried from the
+        first position and alphabetically within a position, deletions from the last
+        position, and additions by added letter and then from the last position.
+
         Parameters:
             subtext (str): The input subtext for which to find completions.
 
@@ -201,44 +335,104 @@ class AutoComplete:
             Optional[str]: The best matching sentence or None if no match is found.
         """
 
-        combining_list = self.replace_char(subtext) + self.delete_char(subtext) + self.add_char(subtext)
-        higher = float('-inf')
-        found_key = ""
-        for combination in combining_list:
-            if combination[1] > higher:
-                higher = combination[1]
-                found_key = combination[0]
+        n = len(subtext)
+        score = (n - 1) * 2
+        path = self.ht.walk(subtext)
+        # (-score, kind, added letter, tie order, position), sorted best first. Kind 0 is a
+        # replacement, 1 a deletion and 2 an addition.
+        edits = []
+
+        mismatch = self._scan_mismatch(subtext)
+        if mismatch is not None and mismatch is not MULTIPLE_MISMATCHES:
+            _, start_index, end_index = mismatch
+            for i in self._replacement_positions(path, start_index, end_index):
+                edits.append((-self.replacement_score(i, score), 0, '', i, i))
+        for i in self._deletion_positions(subtext, path):
+            edits.append((-self.deletion_score(i, score), 1, '', -i, i))
+        for i in self._addition_positions(subtext, path):
+            for char in path[i].children:
+                edits.append((-self.addition_score(i, n * 2), 2, char, -i, i))
+
+        edits.sort()
+        for _, kind, char, _, i in edits:
+            if kind == 0:
+                found_key = next(self._replacements_at(path[i], subtext, i), None)
+            elif kind == 1:
+                found_key = self._deletion_at(path[i], subtext, i)
+            else:
+                found_key = self._addition_at(path[i], subtext, i, char)
+            if found_key is not None:
+                return found_key
 
-        return found_key
+        return ""
 
-    def check_if_input_in_line(self, user_input_words: List[str], line_words: List[str]) -> bool:
+    @staticmethod
+    def intersect_postings(postings: List[Sequence[int]]) -> Iterator[int]:
         """
-        Checks if the user input words appear sequentially within a line of words.
+        Yields the line ids present in every posting list, in ascending order.
+
+        The shortest list drives the walk and a pointer into each other list is moved
+        forward with a binary search, so no intermediate set is ever allocated.
 
         Parameters:
-            user_input_words (List[str]): The list of words from the user's input.
-            line_words (List[str]): The list of words from a line in the dataset.
+            postings (List[Sequence[int]]): Sorted posting lists to intersect.
 
         Returns:
-            bool: True if the input words are found sequentially in the line, False otherwise.
+            Iterator[int]: The common line ids.
         """
-        for i, word in enumerate(line_words):
-            if user_input_words[0] in word:
-                j, k = 0, i
-                while j < len(user_input_words) and k < len(line_words):
-                    if user_input_words[j] not in line_words[k]:
-                        return False
-                    j += 1
-                    k += 1
+        postings = sorted(postings, key=len)
+        first, others = postings[0], postings[1:]
+        pointers = [0] * len(others)
+
+        for line_id in first:
+            for j, other in enumerate(others):
+                pointers[j] = bisect_left(other, line_id, pointers[j])
+                if pointers[j] == len(other):
+                    return
+                if other[pointers[j]] != line_id:
+                    break
+            else:
+                yield line_id
+
+    def split_words(self, user_input: str) -> List[str]:
+        """
+        Splits the user's input into its cleaned, lowercase, alphabetical words.
 
-                if j == len(user_input_words):
-                    return True
-        return False
+        The input is split the same way as the lines of the dataset.
+
+        Parameters:
+            user_input (str): The input string provided by the user.
+
+        Returns:
+            List[str]: The words of the input.
+        """
+        return split_words(user_input)
+
+    @staticmethod
+    def _extends(previous_words: Tuple[str, ...], user_words: Tuple[str, ...]) -> bool:
+        """
+        Checks if a query was typed by continuing a previous one.
+
+        Parameters:
+            previous_words (Tuple[str, ...]): The words of the previous query.
+            user_words (Tuple[str, ...]): The words of the new query.
+
+        Returns:
+            bool: True if the new query has the same words, except that its word at the
+                  previous last position may continue it, optionally followed by more words.
+        """
+        n = len(previous_words)
+        return (n <= len(user_words) and previous_words[:-1] == user_words[:n - 1]
+                and user_words[n - 1].startswith(previous_words[-1]))
 
     def get_best_k_completion(self, user_input: str, k: int = 5) -> List[AutoCompleteData]:
         """
         Retrieves the top K autocomplete suggestions based on user input.
 
+        Results are cached on the normalized words of the input, so retyping or erasing
+        back to an earlier query does not recompute it. The cache holds line ids, and new
+        AutoCompleteData instances are built for every call, so callers may modify them.
+
         Parameters:
             user_input (str): The input string provided by the user.
             k (int): The maximum number of suggestions to return (default is 5).
@@ -246,42 +440,79 @@ class AutoComplete:
         Returns:
             List[AutoCompleteData]: A list of autocomplete suggestions.
         """
+        user_words = tuple(self.split_words(user_input))
+        return self.create_auto_complete(self.__cached_completion(user_words, k))
 
-        user_words = self.__word_re.findall(user_input.lower().strip())
-        lines = set()
+    def _find_best_k_completion(self, user_words: Tuple[str, ...], k: int) -> Tuple[int, ...]:
+        """
+        Computes the top K autocomplete suggestions for the normalized words of an input.
+
+        Parameters:
+            user_words (Tuple[str, ...]): The cleaned, lowercase words of the user's input.
+            k (int): The maximum number of suggestions to return.
+
+        Returns:
+            Tuple[int, ...]: The line ids of the suggestions.
+        """
+
+        ht = self.ht
+        line_tokens = ht.line_tokens
+
+        postings = []
         correct_sentence = []
+        exact = True
 
-        # Find lines that contain all the words in the input sentence and intersect them
+        # Find the posting lists of all the words in the input sentence
         for word in user_words:
-            if word in self.ht:
-                if len(lines) == 0:
-                    lines = set(self.ht[word])
-                else:
-                    lines.intersection_update(self.ht[word])
+            if word in ht:
+                postings.append(ht[word])
                 correct_sentence.append(word)
             else:
                 new_word = self.get_best_completions(word)
                 if new_word:
-                    if len(lines) == 0:
-                        lines = set(self.ht[new_word])
-                    else:
-                        lines.intersection_update(self.ht[new_word])
+                    postings.append(ht[new_word])
                     correct_sentence.append(new_word)
+                    exact = False
                 else:
-                    return []
-
-        final_lines = []
-        if len(user_words) > 1:
-            for line in lines:
-                line_words = self.__word_re.findall(line[0].lower().strip())
-                if self.check_if_input_in_line(correct_sentence, line_words):
-                    final_lines.append(line)
-        else:
-            final_lines = list(lines)
-
-        if len(final_lines) > k:
-            random_elements = random.sample(final_lines, k)
-            return self.create_auto_complete(random_elements)
+                    return ()
+
+        if not postings:
+            return ()
+
+        # Every word prefix matches a superset of the lines of its continuations, so the lines
+        # of a query this one extends only need to be intersected with the changed words.
+        previous = self.__previous
+        if exact and previous is not None and self._extends(previous[0], user_words):
+            postings = [previous[1]] + postings[len(previous[0]) - 1:]
+
+        matches = SentenceMatcher(correct_sentence).matches if len(user_words) > 1 else None
+        if len(postings) == 1 and matches is None:
+            # A single posting list already holds exactly the matching lines.
+            matched_lines = postings[0]
+            reservoir = random.sample(matched_lines, k) if len(matched_lines) > k else list(matched_lines)
         else:
-            return self.create_auto_complete(final_lines)
-          
\ No newline at end of file
+            # Intersect them and draw the k suggestions uniformly from every matching line while
+            # streaming, with reservoir sampling (Algorithm R): the i-th matching line replaces a
+            # random earlier pick with probability k / i.
+            randrange = random.randrange
+            reservoir = []
+            matched_lines = array('i') if exact else None
+            count = 0
+            for line_id in self.intersect_postings(postings):
+                if matches is not None and not matches(line_tokens(line_id)):
+                    continue
+                if count < k:
+                    reservoir.append(line_id)
+                else:
+                    j = randrange(count + 1)
+                    if j < k:
+                        reservoir[j] = line_id
+                count += 1
+                if matched_lines is not None:
+                    matched_lines.append(line_id)
+
+        # Lines found through a corrected word don't belong to what the user typed, so only the
+        # lines of an exact query can be filtered by the next one.
+        self.__previous = (user_words, matched_lines) if exact else None
+
+        return tuple(reservoir)
@@ -1,10 +1,17 @@
+import mmap
 import os
 import pickle
+import struct
 
 from auto_complete import AutoComplete
 from zip_opener import ZipOpener
 from process_data import ProcessData
 
+# Starts every data file, followed by the format version. Files that don't start with
+# the current header were written by another version and are rebuilt.
+DATA_FILE_MAGIC = b"ACDATA"
+DATA_FILE_VERSION = 2
+
 
 class AutoCompleteApp:
     """
@@ -26,24 +33,79 @@ class AutoCompleteApp:
         """
         Serializes and saves processed data to a file using pickle.
 
+        The file starts with an 8-byte header holding DATA_FILE_MAGIC and the format
+        version. The data is then pickled with protocol 5 and its arrays are written
+        out-of-band after the pickle stream, each aligned to 8 bytes. The file ends with a
+        table of the buffers' offsets and lengths, followed by the offset of that table.
+
+        The data is written to a temporary file that then replaces data.pkl, so an
+        interrupted save never leaves a partial file behind, and an index loaded from the
+        old file keeps its memory mapping valid while it is pickled.
+
         Parameters:
             data_processor (ProcessData): The data processor containing processed data.
         """
         print("Saving data to a file... Please wait.")
-        with open("data.pkl", "wb") as file:
-            pickle.dump(data_processor.get_data(), file)
+        buffers = []
+        with open("data.pkl.tmp", "wb") as file:
+            file.write(self._data_file_header())
+            pickle.dump(data_processor.get_data(), file, protocol=5, buffer_callback=buffers.append)
+
+            table = [struct.pack("<Q", len(buffers))]
+            for buffer in buffers:
+                raw = buffer.raw()
+                file.write(b"\0" * (-file.tell() % 8))
+                table.append(struct.pack("<QQ", file.tell(), raw.nbytes))
+                file.write(raw)
+
+            table_offset = file.tell()
+            file.write(b"".join(table))
+            file.write(struct.pack("<Q", table_offset))
+        os.replace("data.pkl.tmp", "data.pkl")
         print("Saved data successfully.")
 
-    def load_data_from_file(self, data_processor):
+    @staticmethod
+    def _data_file_header() -> bytes:
+        """
+        Builds the header written at the start of the data file.
+
+        Returns:
+            bytes: DATA_FILE_MAGIC followed by DATA_FILE_VERSION, 8 bytes in total.
+        """
+        return DATA_FILE_MAGIC + struct.pack("<H", DATA_FILE_VERSION)
+
+    def load_data_from_file(self, data_processor) -> bool:
         """
         Loads serialized data from a file and deserializes it using pickle.
 
+        The file is memory-mapped and the out-of-band buffers are passed to pickle as
+        views into the mapping, so the arrays are not copied while loading.
+
         Parameters:
             data_processor (ProcessData): The data processor to populate with loaded data.
+
+        Returns:
+            bool: True if the data was loaded, False if the file was written by another
+                  version and has to be rebuilt.
         """
-        print("Loading processed data from file... Please wait.")
+        header = self._data_file_header()
         with open("data.pkl", "rb") as file:
-            data_processor.set_data(pickle.load(file))
+            if file.read(len(header)) != header:
+                print("The processed data file is outdated.")
+                return False
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        print("Loading processed data from file... Please wait.")
+        view = memoryview(mapping)
+        table_offset, = struct.unpack_from("<Q", mapping, len(mapping) - 8)
+        count, = struct.unpack_from("<Q", mapping, table_offset)
+        buffers = []
+        for i in range(count):
+            offset, length = struct.unpack_from("<QQ", mapping, table_offset + 8 + 16 * i)
+            buffers.append(view[offset:offset + length])
+
+        data_processor.set_data(pickle.loads(view[len(header):], buffers=buffers))
+        return True
 
     def user_interaction(self, data_processor):
         """
@@ -87,13 +149,11 @@ class AutoCompleteApp:
         zip_opener = ZipOpener('dataset.zip')
         data_processor = ProcessData()
 
-        # Check if processed data exists; if not, process and save it
-        if not os.path.exists("data.pkl"):
+        # Check if processed data exists and is up to date; if not, process and save it
+        if not os.path.exists("data.pkl") or not self.load_data_from_file(data_processor):
             print("Processing data... Please wait.")
             zip_opener.read(data_processor)
             self.save_data_to_file(data_processor)
-        else:
-            self.load_data_from_file(data_processor)
 
         print("Data processed successfully.\n\n")
 
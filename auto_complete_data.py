@@ -9,6 +9,8 @@ class AutoCompleteData:
         score (int): The relevance score of the suggestion (default is 0).
     """
 
+    __slots__ = ('completed_sentence', 'source_text', 'offset', 'score')
+
     def __init__(self, completed_sentence: str, source_text: str, offset: int, score: int = 0):
         """
         Initializes the AutoCompleteData instance with sentence details.
@@ -19,10 +21,10 @@ class AutoCompleteData:
             offset (int): The line number in the file.
             score (int, optional): The relevance score of the suggestion. Defaults to 0.
         """
-        self.__completed_sentence = completed_sentence
-        self.__source_text = source_text
-        self.__offset = offset
-        self.__score = score
+        self.completed_sentence = completed_sentence
+        self.source_text = source_text
+        self.offset = offset
+        self.score = score
 
     def __str__(self):
         """
@@ -31,4 +33,4 @@ class AutoCompleteData:
         Returns:
             str: A formatted string containing the sentence, source filename, and line number.
         """
-        return f" {self.__completed_sentence} (Filename: {self.__source_text} Line: {self.__offset})"
+        return f" {self.completed_sentence} (Filename: {self.source_text} Line: {self.offset})"
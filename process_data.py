@@ -1,43 +1,120 @@
-from collections import defaultdict
-from typing import List
+from itertools import islice
+from typing import Iterable, Iterator, List
 import re
+from trie_index import TrieIndex
+
+# The words of a line: whole runs of lowercase letters, not touching digits or underscores.
+WORD_RE = re.compile(r'\b[a-z]+\b')
+
+# Maps ASCII to what the word regex distinguishes: lowercase letters, '0' for the other
+# word characters (digits and '_') and a space for the rest. Line feeds are kept, so a
+# block of lines can be translated at once and split back into its lines.
+NORM_TABLE = {c: chr(c).lower() if chr(c).isalpha() else '0' if chr(c).isalnum() or c == ord('_') else ' '
+              for c in range(128)}
+NORM_TABLE[ord('\n')] = '\n'
+
+# NORM_TABLE for ASCII bytes, used to translate whole blocks. str.translate leaves its
+# ASCII fast path at the first non-ASCII character, bytes.translate never does.
+NORM_BYTES = bytes(ord(NORM_TABLE[c]) for c in range(128)) + b' ' * 128
+
+# The number of characters of a text stream, or of lines of other iterables, read per block.
+BLOCK_SIZE = 1 << 20
+BLOCK_LINES = 4096
+
+
+def _clean_words(clean_text: str) -> List[str]:
+    """
+    Splits ASCII text translated with NORM_TABLE into its words.
+
+    Parameters:
+        clean_text (str): The translated text.
+
+    Returns:
+        List[str]: The words of the text, without those that contained digits or underscores.
+    """
+    words = clean_text.split()
+    if '0' in clean_text:
+        words = [word for word in words if '0' not in word]
+    return words
+
+
+def split_words(text: str) -> List[str]:
+    """
+    Splits a text into its cleaned, lowercase, alphabetical words.
+
+    Lines of the dataset and user queries are both split here, so their words always
+    match. ASCII text is translated in a single pass and split on whitespace, dropping
+    the words that contain digits or underscores, as the word regex does. Other text
+    falls back to the word regex.
+
+    Parameters:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The words of the text.
+    """
+    clean_text = text.translate(NORM_TABLE)
+    if not clean_text.isascii():
+        return WORD_RE.findall(text.lower())
+    return _clean_words(clean_text)
+
+
+def _line_blocks(lines: Iterable[str]) -> Iterator[List[str]]:
+    """
+    Groups the lines of a file into blocks, split as str.splitlines does.
+
+    A text stream is read a block of complete lines at a time and each block is split
+    with a single call. Text streams only break lines on '\n' and '\r', so this also
+    splits the rest (e.g. form feeds).
+
+    Parameters:
+        lines (Iterable[str]): The lines of a text file, with or without line endings, or
+                               a text stream over it.
+
+    Returns:
+        Iterator[List[str]]: The lines of the file without their line endings, in blocks.
+    """
+    readlines = getattr(lines, 'readlines', None)
+    if readlines is not None:
+        while True:
+            block = ''.join(readlines(BLOCK_SIZE))
+            if not block:
+                return
+            yield block.splitlines()
+
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, BLOCK_LINES))
+        if not batch:
+            return
+        yield [part for line in batch for part in line.splitlines() or ['']]
 
 
 class ProcessData:
     """
     Processes and manages text data for autocomplete functionality.
 
-    This class handles the cleaning of text data, generation of substrings, and
-    storage of processed information for efficient lookup during autocomplete operations.
+    This class handles the cleaning of text data and the indexing of every word's
+    prefixes in a trie for efficient lookup during autocomplete operations.
     """
 
     def __init__(self):
         """
-        Initializes the ProcessData instance with an empty defaultdict for storing data.
+        Initializes the ProcessData instance with an empty TrieIndex for storing data.
         """
-        self.__data = defaultdict(list)
-        self.__word_re = re.compile(r'\b[a-z]+\b')
+        self.__data = TrieIndex()
 
-    def get_all_substrings(self, words: List[str]):
+    def split_words(self, line: str) -> List[str]:
         """
-        Generates all possible substrings from a list of words.
-
-        For each word, both prefixes and suffixes of length 2 up to the word's length
-        are generated and added to the substring set.
+        Splits a line into its cleaned, lowercase, alphabetical words.
 
         Parameters:
-            words (List[str]): A list of words from which substrings are generated.
+            line (str): The input line to split.
 
         Returns:
-            set: A set of unique substrings.
+            List[str]: The words of the line.
         """
-        sub_strings = set()
-        for i in range(len(words)):
-            n = len(words[i])
-            for j in range(2, n+1):
-                sub_strings.add(words[i][0:j])
-                sub_strings.add(words[i][-j:n])
-        return sub_strings
+        return split_words(line)
 
     def remove_punctuation(self, line):
         """
@@ -51,38 +128,75 @@ class ProcessData:
         Returns:
             str: The cleaned, lowercase version of the line without punctuation.
         """
-        return ' '.join(self.__word_re.findall(line.lower()))
+        return ' '.join(self.split_words(line))
+
+
+    def add_line(self, line: str, line_number: int, file_id: int, tokens: List[str]):
+        """
+        Stores a line and indexes the prefixes of its words.
 
+        Parameters:
+            line (str): The original line content.
+            line_number (int): The line number in the source file.
+            file_id (int): The id of the source file in the internal TrieIndex.
+            tokens (List[str]): The cleaned, lowercase words of the line.
+        """
+        # The cleaned words are kept with the line so queries never re-tokenize it.
+        line_id = self.__data.add_line(line, line_number, file_id, tokens)
+        for word in set(tokens):
+            self.__data.insert(word, line_id)
 
-    def process(self, lines: List, filename: str):
+    def process(self, lines: Iterable[str], filename: str):
         """
-        Processes a list of lines from a text file and stores substrings with metadata.
+        Processes the lines of a text file and stores word prefixes with metadata.
 
-        Each line is cleaned, substrings are generated, and the data is stored in the
-        internal defaultdict along with the original line content, line number, and filename.
+        Each line is split into its cleaned words and the prefixes of those words are
+        indexed in the internal TrieIndex along with the original line content, line
+        number, filename, and the cleaned words themselves. The lines are consumed in
+        blocks, so a file can be streamed without holding its whole content, and each
+        block is translated with a single call instead of once per line.
 
         Parameters:
-            lines (List[str]): A list of lines from a text file.
+            lines (Iterable[str]): The lines of a text file, with or without line endings,
+                                   or a text stream over it.
             filename (str): The name of the file being processed.
         """
 
-        for i in range(len(lines)):
-            clean_line = self.remove_punctuation(lines[i].strip())
-
-            if clean_line:
-                sub_string = self.get_all_substrings(clean_line.split())
-                for substring in sub_string:
-                    self.__data[substring].append((lines[i], i+1, filename or "Unknown"))
+        file_id = self.__data.add_file(filename or "Unknown")
+        line_number = 0
+        for block in _line_blocks(lines):
+            # No line of the block holds a line feed, so the translated block splits back into
+            # its lines. Non-ASCII characters become spaces, but their lines fall back to the regex.
+            text = '\n'.join(block)
+            ascii_block = text.isascii()
+            clean_block = text.encode('ascii', 'replace').translate(NORM_BYTES).decode('ascii')
+            for line, clean_line in zip(block, clean_block.split('\n')):
+                line_number += 1
+                if ascii_block or line.isascii():
+                    tokens = _clean_words(clean_line)
+                else:
+                    tokens = WORD_RE.findall(line.lower())
+                if tokens:
+                    self.add_line(line, line_number, file_id, tokens)
         print("proccessed file", filename)
 
 
+    def merge(self, data):
+        """
+        Appends data processed separately, e.g. by a worker process, to the internal data.
+
+        Parameters:
+            data (TrieIndex): The processed data of files read after the ones already processed.
+        """
+        self.__data.merge(data)
+
     def get_data(self):
         """
         Retrieves the processed data.
 
         Returns:
-            defaultdict: A dictionary where keys are substrings and values are lists of tuples
-                         containing the sentence, line number, and source filename.
+            TrieIndex: An index where keys are word prefixes and values are sorted lists of
+                       line ids into its table of sentences, line numbers, and filenames.
         """
         return self.__data
 
@@ -91,6 +205,6 @@ class ProcessData:
         Sets the internal data with the provided data.
 
         Parameters:
-            data (defaultdict): The processed data to be stored internally.
+            data (TrieIndex): The processed data to be stored internally.
         """
         self.__data = data
@@ -0,0 +1,75 @@
+import ahocorasick
+from typing import Dict, Iterable, List
+
+
+class SentenceMatcher:
+    """
+    Checks whether the words of a query appear sequentially within lines of words.
+
+    A line matches when it has consecutive words such that the i-th query word is a
+    substring of the i-th of them. The query words are compiled once into an
+    Aho-Corasick automaton, so finding which query words a line word contains is a
+    single pass of the automaton over it instead of one substring search per pair.
+    """
+
+    def __init__(self, words: List[str]):
+        """
+        Initializes the SentenceMatcher by building the automaton over the query words.
+
+        Parameters:
+            words (List[str]): The corrected words of the user's input, in order.
+        """
+        self.word_count = len(words)
+        self.__accept = 1 << (self.word_count - 1)
+
+        # A word may appear at several positions of the query, so its value is the bitmask of all of them.
+        positions = {}
+        for i, word in enumerate(words):
+            positions[word] = positions.get(word, 0) | 1 << i
+
+        self.__automaton = ahocorasick.Automaton()
+        for word, mask in positions.items():
+            self.__automaton.add_word(word, mask)
+        self.__automaton.make_automaton()
+        self.__masks: Dict[str, int] = {}
+
+    def word_mask(self, word: str) -> int:
+        """
+        Computes which query words are contained in a line word.
+
+        Line words repeat a lot across lines, so the result is cached per word.
+
+        Parameters:
+            word (str): A cleaned word from a line in the dataset.
+
+        Returns:
+            int: A bitmask with bit i set if the i-th query word is a substring of the word.
+        """
+        mask = self.__masks.get(word)
+        if mask is None:
+            mask = 0
+            for _, positions in self.__automaton.iter(word):
+                mask |= positions
+            self.__masks[word] = mask
+        return mask
+
+    def matches(self, line_words: Iterable[str]) -> bool:
+        """
+        Checks if the query words appear sequentially within a line of words.
+
+        This is a bit-parallel Shift-And scan: bit i of the state is set when the line
+        words read so far end with a match of the first i + 1 query words. Each line
+        word is read once, so the work is linear in the line's length.
+
+        Parameters:
+            line_words (Iterable[str]): The cleaned words of a line, as stored in the index.
+
+        Returns:
+            bool: True if the query words are found sequentially in the line, False otherwise.
+        """
+        state = 0
+        for word in line_words:
+            state = (state << 1 | 1) & self.word_mask(word)
+            if state & self.__accept:
+                return True
+        return False
@@ -0,0 +1,74 @@
+import unittest
+
+from auto_complete import AutoComplete
+from process_data import ProcessData
+
+LINES = [
+    "the quick brown fox jumps over the lazy dog",
+    "a quick brown dog sleeps",
+    "the lazy dog barks at the quick fox",
+    "brown bread and quick breakfast",
+    "the thesis of the theory",
+    "dogs and foxes are quick",
+    "there is a brown fox in the theatre",
+    "lazy afternoons of the quiet dog",
+]
+
+
+class TestAutoCompleteIncremental(unittest.TestCase):
+    """
+    Tests that reusing the previous query's lines gives the same suggestions as a fresh search.
+    """
+
+    def setUp(self):
+        data_processor = ProcessData()
+        data_processor.process(LINES, "lines.txt")
+        self.data = data_processor.get_data()
+
+    @staticmethod
+    def keystrokes(keys):
+        """
+        Replays keystrokes the way a user types them into the application.
+
+        Parameters:
+            keys (List[str]): Characters to type, '<' for a backspace or '#' to start a new sentence.
+
+        Returns:
+            List[str]: The query after every keystroke.
+        """
+        queries = []
+        query = ""
+        for key in keys:
+            if key == '<':
+                query = query[:-1]
+            elif key == '#':
+                query = ""
+            else:
+                query += key
+            queries.append(query)
+        return queries
+
+    @staticmethod
+    def suggestions(auto_complete, query):
+        return sorted(str(result) for result in auto_complete.get_best_k_completion(query, k=len(LINES)))
+
+    def test_typing_matches_fresh_search(self):
+        keys = (list("the quick bro") + ['<'] * 3 + list("lazy dog") + ['#'] + list("quick brown f")
+                + ['<'] * 8 + list("lazzy d") + ['#'] + list("the the") + ['<', '<'] + list("ory"))
+        auto_complete = AutoComplete(self.data)
+        for query in self.keystrokes(keys):
+            with self.subTest(query=query):
+                self.assertEqual(self.suggestions(auto_complete, query), self.suggestions(AutoComplete(self.data), query))
+
+    def test_results_are_fresh_objects(self):
+        auto_complete = AutoComplete(self.data)
+        first = auto_complete.get_best_k_completion("lazy", k=len(LINES))
+        expected = sorted(str(result) for result in first)
+        for result in first:
+            result.completed_sentence = "changed"
+
+        self.assertEqual(self.suggestions(auto_complete, "lazy"), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import pickle
+import unittest
+
+from process_data import ProcessData
+
+
+class TestTrieIndexMerge(unittest.TestCase):
+    """
+    Tests merging indexes that went through pickle, as worker processes and the data file do.
+    """
+
+    @staticmethod
+    def partial(filename: str, lines):
+        """
+        Builds the index of a single file, as a worker process does.
+
+        Parameters:
+            filename (str): The name of the file.
+            lines (List[str]): The lines of the file.
+
+        Returns:
+            TrieIndex: The index of the file.
+        """
+        data_processor = ProcessData()
+        data_processor.process(lines, filename)
+        return data_processor.get_data()
+
+    def test_merge_unpickled_partials(self):
+        data_processor = ProcessData()
+        for i in range(3):
+            partial = self.partial(f"file{i}.txt", ["hello world", f"say hello {i} times"])
+            data_processor.merge(pickle.loads(pickle.dumps(partial, protocol=5)))
+
+        data = data_processor.get_data()
+        self.assertEqual(list(data["hello"]), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(data.line(5), ("say hello 2 times", 2, "file2.txt"))
+        self.assertEqual(list(data.line_tokens(5)), ["say", "hello", "times"])
+
+    def test_extend_unpickled_index(self):
+        data_processor = ProcessData()
+        data_processor.process(["hello world"], "file0.txt")
+        data_processor.set_data(pickle.loads(pickle.dumps(data_processor.get_data(), protocol=5)))
+
+        data_processor.process(["hello there"], "file1.txt")
+        data_processor.merge(pickle.loads(pickle.dumps(self.partial("file2.txt", ["world peace"]), protocol=5)))
+
+        data = data_processor.get_data()
+        self.assertEqual(list(data["hello"]), [0, 1])
+        self.assertEqual(list(data["wor"]), [0, 2])
+        self.assertEqual(data.line(2), ("world peace", 1, "file2.txt"))
+        self.assertEqual(list(data.line_tokens(1)), ["hello", "there"])
+
+    def test_add_line_to_unpickled_index(self):
+        data = pickle.loads(pickle.dumps(self.partial("file0.txt", ["hello world"]), protocol=5))
+
+        line_id = data.add_line("hello there", 2, 0, ["hello", "there"])
+        data.insert("hello", line_id)
+
+        self.assertEqual(list(data["hello"]), [0, 1])
+        self.assertEqual(data.line(1), ("hello there", 2, "file0.txt"))
+        self.assertEqual(list(data.line_tokens(1)), ["hello", "there"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,392 @@
+import pickle
+from array import array
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+
+class TrieNode:
+    """
+    A single node of the prefix trie.
+
+    Attributes:
+        children (dict): Maps the next character to the child TrieNode.
+        postings (Optional[array]): The ascending ids of the lines indexed under the key
+                                    ending at this node, or None if no key ends here.
+    """
+
+    __slots__ = ('children', 'postings')
+
+    def __init__(self):
+        """
+        Initializes an empty TrieNode with no children and no postings.
+        """
+        self.children = {}
+        self.postings = None
+
+
+class TrieIndex:
+    """
+    Stores the indexed word prefixes of the dataset in a trie.
+
+    Every prefix of length 2 or more of an indexed word is a key. Keys that share a
+    prefix share a single path in the trie, and each node where a key ends carries
+    the posting list of the lines containing it. The class exposes the
+    same `in` / `[]` interface as the dictionary it replaces.
+
+    Postings are line ids into a line table kept as parallel arrays (sentence, line
+    number, file id, cleaned words). Ids are handed out in processing order, so every posting list
+    is sorted by (file, line number) and can be intersected with a merge walk. The cleaned
+    words of all lines are stored flattened, as ids into a vocabulary of distinct words
+    with the offset where each line's words start.
+    """
+
+    def __init__(self):
+        """
+        Initializes the TrieIndex with an empty root node and an empty line table.
+        """
+        self.root = TrieNode()
+        self.files = []
+        self.sentences = []
+        self.line_numbers = array('i')
+        self.file_ids = array('i')
+        self.words = []
+        self.token_ids = array('i')
+        self.token_offsets = array('q', (0,))
+        self.__word_ids = {}
+
+    def _make_writable(self) -> None:
+        """
+        Copies the columns of the line table that were loaded as read-only views into arrays.
+
+        An index unpickled with protocol 5 holds memoryviews over the pickled buffers,
+        which can't be appended to, so they are copied before the index is modified. The
+        columns are always loaded and copied together, so the first one tells whether
+        they need copying.
+        """
+        if isinstance(self.line_numbers, array):
+            return
+        for name, typecode in (('line_numbers', 'i'), ('file_ids', 'i'), ('token_ids', 'i'), ('token_offsets', 'q')):
+            setattr(self, name, array(typecode, getattr(self, name)))
+
+    def add_file(self, filename: str) -> int:
+        """
+        Registers a source file in the line table.
+
+        Parameters:
+            filename (str): The name of the file being processed.
+
+        Returns:
+            int: The id of the file.
+        """
+        self._make_writable()
+        self.files.append(filename)
+        return len(self.files) - 1
+
+    def _word_id(self, word: str) -> int:
+        """
+        Finds the id of a word in the vocabulary, adding the word if it is new.
+
+        The mapping from words to ids is not stored with the index, so it is rebuilt on
+        the first lookup after loading.
+
+        Parameters:
+            word (str): A cleaned word from the dataset.
+
+        Returns:
+            int: The index of the word in the vocabulary.
+        """
+        word_ids = self.__word_ids
+        if word_ids is None:
+            word_ids = self.__word_ids = {word: i for i, word in enumerate(self.words)}
+
+        word_id = word_ids.get(word)
+        if word_id is None:
+            word_id = word_ids[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+    def add_line(self, sentence: str, line_number: int, file_id: int, tokens: Sequence[str]) -> int:
+        """
+        Registers a line in the line table.
+
+        Parameters:
+            sentence (str): The original line content.
+            line_number (int): The line number in the source file.
+            file_id (int): The id returned by add_file for the source file.
+            tokens (Sequence[str]): The cleaned, lowercase words of the line.
+
+        Returns:
+            int: The id of the line, to be used as its posting.
+        """
+        self._make_writable()
+        self.sentences.append(sentence)
+        self.line_numbers.append(line_number)
+        self.file_ids.append(file_id)
+        self.token_ids.extend(map(self._word_id, tokens))
+        self.token_offsets.append(len(self.token_ids))
+        return len(self.sentences) - 1
+
+    def line(self, line_id: int) -> Tuple[str, int, str]:
+        """
+        Retrieves the data of a line from the line table.
+
+        Parameters:
+            line_id (int): The id of the line.
+
+        Returns:
+            Tuple[str, int, str]: The sentence, line number, and source filename.
+        """
+        return self.sentences[line_id], self.line_numbers[line_id], self.files[self.file_ids[line_id]]
+
+    def line_tokens(self, line_id: int) -> Iterator[str]:
+        """
+        Retrieves the cleaned words of a line from the line table.
+
+        Parameters:
+            line_id (int): The id of the line.
+
+        Returns:
+            Iterator[str]: The cleaned, lowercase words of the line, in order.
+        """
+        token_offsets = self.token_offsets
+        return map(self.words.__getitem__, self.token_ids[token_offsets[line_id]:token_offsets[line_id + 1]])
+
+    @staticmethod
+    def _add_posting(node: TrieNode, line_id: int) -> None:
+        """
+        Appends a line id to the node's posting list, skipping repeated ids.
+
+        All the words of a line are inserted one after another and line ids only
+        grow, so comparing against the last posting is enough to keep a single
+        sorted posting per line. Postings loaded as a read-only view are copied into an
+        array first.
+
+        Parameters:
+            node (TrieNode): The node where the key ends.
+            line_id (int): The id of the line containing the key.
+        """
+        if node.postings is None:
+            node.postings = array('i', (line_id,))
+        elif node.postings[-1] != line_id:
+            if not isinstance(node.postings, array):
+                node.postings = array('i', node.postings)
+            node.postings.append(line_id)
+
+    def merge(self, other: 'TrieIndex') -> None:
+        """
+        Appends the lines and keys of another index, built over later files, to this one.
+
+        The other index's line and file ids are shifted past this index's ids, so its
+        postings can be appended and every posting list stays sorted. Subtrees that only
+        exist in the other index are moved over instead of copied. Either index may have
+        been unpickled, so postings loaded as read-only views are copied into arrays.
+
+        Parameters:
+            other (TrieIndex): The index to merge in. It must not be used afterwards.
+        """
+        self._make_writable()
+        line_offset = len(self.sentences)
+        file_offset = len(self.files)
+        self.files.extend(other.files)
+        self.sentences.extend(other.sentences)
+        self.line_numbers.extend(other.line_numbers)
+        self.file_ids.extend(file_id + file_offset for file_id in other.file_ids)
+
+        # The other index has its own vocabulary, so its word ids are mapped to this one's.
+        token_offset = len(self.token_ids)
+        word_ids = array('i', map(self._word_id, other.words))
+        self.token_ids.extend(map(word_ids.__getitem__, other.token_ids))
+        self.token_offsets.extend(offset + token_offset for offset in other.token_offsets[1:])
+
+        stack = [(self.root, other.root)]
+        while stack:
+            node, other_node = stack.pop()
+            if other_node.postings:
+                postings = other_node.postings
+                if line_offset:
+                    postings = array('i', [line_id + line_offset for line_id in postings])
+                elif not isinstance(postings, array):
+                    postings = array('i', postings)
+                if node is other_node or node.postings is None:
+                    node.postings = postings
+                else:
+                    if not isinstance(node.postings, array):
+                        node.postings = array('i', node.postings)
+                    node.postings.extend(postings)
+
+            for char, other_child in other_node.children.items():
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = other_child
+                stack.append((child, other_child))
+
+    def insert(self, word: str, line_id: int) -> None:
+        """
+        Indexes the prefixes of length 2 or more of a word.
+
+        Parameters:
+            word (str): A cleaned word from the dataset.
+            line_id (int): The id of the line containing the word.
+        """
+        # Prefixes share the word's own path, so a single walk covers all of them.
+        # Suffixes are not indexed: queries only ever look up whole or partially typed words.
+        node = self.root
+        for depth, char in enumerate(word, 1):
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = TrieNode()
+            node = child
+            if depth >= 2:
+                self._add_posting(node, line_id)
+
+    def find(self, key: str) -> Optional[TrieNode]:
+        """
+        Finds the node where the key ends.
+
+        Parameters:
+            key (str): The key to look up.
+
+        Returns:
+            Optional[TrieNode]: The node for the key, or None if the path does not exist.
+        """
+        return self.descend(self.root, key, 0)
+
+    def walk(self, word: str) -> List[TrieNode]:
+        """
+        Follows the word down the trie for as long as its characters exist.
+
+        Parameters:
+            word (str): The word to follow.
+
+        Returns:
+            List[TrieNode]: The nodes reached after 0, 1, 2, ... characters of the word,
+                            starting with the root.
+        """
+        path = [self.root]
+        node = self.root
+        for char in word:
+            node = node.children.get(char)
+            if node is None:
+                break
+            path.append(node)
+        return path
+
+    @staticmethod
+    def descend(node: TrieNode, word: str, start: int) -> Optional[TrieNode]:
+        """
+        Follows the characters of the word from the given index, starting at a node.
+
+        Parameters:
+            node (TrieNode): The node to start from.
+            word (str): The word to follow.
+            start (int): The index of the first character to follow.
+
+        Returns:
+            Optional[TrieNode]: The node reached, or None if the path does not exist.
+        """
+        for char in word[start:] if start else word:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    @staticmethod
+    def is_key(node: Optional[TrieNode]) -> bool:
+        """
+        Checks whether an indexed key ends at the node.
+
+        Parameters:
+            node (Optional[TrieNode]): The node to check.
+
+        Returns:
+            bool: True if the node exists and carries postings, False otherwise.
+        """
+        return node is not None and bool(node.postings)
+
+    def __contains__(self, key: str) -> bool:
+        return self.is_key(self.find(key))
+
+    def __getitem__(self, key: str) -> Sequence[int]:
+        node = self.find(key)
+        if node is None or not node.postings:
+            raise KeyError(key)
+        return node.postings
+
+    def __reduce_ex__(self, protocol: int):
+        """
+        Flattens the trie into parallel arrays in breadth-first order.
+
+        Pickling the nodes directly recurses once per trie level, which overflows the
+        stack on long words, so the structure is serialized iteratively instead. All
+        posting lists are concatenated into a single array, and with protocol 5 every
+        array is handed to pickle as a PickleBuffer so it can be stored out-of-band
+        and loaded back as a view without copying.
+
+        Parameters:
+            protocol (int): The pickle protocol in use.
+
+        Returns:
+            tuple: The class, its empty constructor arguments and the flattened state.
+        """
+        nodes = [self.root]
+        chars, parents = [], array('i')
+        offsets, postings = array('q', (0,)), array('i')
+        for index, node in enumerate(nodes):
+            for char, child in node.children.items():
+                nodes.append(child)
+                chars.append(char)
+                parents.append(index)
+                if child.postings:
+                    postings.extend(child.postings)
+                offsets.append(len(postings))
+
+        arrays = [parents, offsets, postings, self.line_numbers, self.file_ids, self.token_ids, self.token_offsets]
+        if protocol >= 5:
+            arrays = [pickle.PickleBuffer(values) for values in arrays]
+        return self.__class__, (), (''.join(chars), self.files, self.sentences, self.words, *arrays)
+
+    @staticmethod
+    def _as_array(values, typecode: str) -> Sequence[int]:
+        """
+        Returns an integer sequence over values loaded from a pickle.
+
+        Parameters:
+            values: An array, or the raw buffer of one when it was pickled with protocol 5.
+            typecode (str): The array typecode of the values.
+
+        Returns:
+            Sequence[int]: The values itself or a zero-copy view over the buffer.
+        """
+        if isinstance(values, array):
+            return values
+        return memoryview(values).cast('B').cast(typecode)
+
+    def __setstate__(self, state):
+        """
+        Rebuilds the trie from the state produced by __reduce_ex__.
+
+        Parameters:
+            state (tuple): The characters of every non-root node, the line table's files,
+                           sentences and vocabulary, followed by the parent indices, posting
+                           offsets, concatenated postings, line numbers, file ids, word ids
+                           and word offsets.
+        """
+        (chars, self.files, self.sentences, self.words,
+         parents, offsets, postings, line_numbers, file_ids, token_ids, token_offsets) = state
+        parents = self._as_array(parents, 'i')
+        offsets = self._as_array(offsets, 'q')
+        postings = self._as_array(postings, 'i')
+        self.line_numbers = self._as_array(line_numbers, 'i')
+        self.file_ids = self._as_array(file_ids, 'i')
+        self.token_ids = self._as_array(token_ids, 'i')
+        self.token_offsets = self._as_array(token_offsets, 'q')
+        self.__word_ids = None
+
+        self.root = TrieNode()
+        nodes = [self.root]
+        for index, (char, parent) in enumerate(zip(chars, parents)):
+            node = TrieNode()
+            start, end = offsets[index], offsets[index + 1]
+            if start != end:
+                node.postings = postings[start:end]
+            nodes[parent].children[char] = node
+            nodes.append(node)
@@ -1,5 +1,44 @@
+import io
+import os
 import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from process_data import ProcessData
+from trie_index import TrieIndex
+
+
+# The archive opened once by each worker process, see open_archive.
+_archive = None
+
+
+def open_archive(zip_file: str) -> None:
+    """
+    Opens the ZIP archive in a worker process, so its directory is only read once per worker.
+
+    Parameters:
+        zip_file (str): The path to the ZIP file.
+    """
+    global _archive
+    _archive = zipfile.ZipFile(zip_file, 'r')
+
+
+def process_file(filename: str) -> TrieIndex:
+    """
+    Processes a single text file of the archive, meant to run in a worker process.
+
+    The file is decoded and read in blocks of lines through a text stream, so neither its
+    raw bytes nor its decoded content are ever held in full.
+
+    Parameters:
+        filename (str): The name of the file within the ZIP archive.
+
+    Returns:
+        TrieIndex: The processed data of the file.
+    """
+    process_data = ProcessData()
+    with _archive.open(filename) as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as text:
+        process_data.process(text, filename)
+    return process_data.get_data()
 
 
 class ZipOpener:
@@ -29,16 +68,24 @@ class ZipOpener:
         """
         Reads and processes all '.txt' files from the ZIP archive.
 
-        For each text file in the ZIP, this method reads its content, splits it into
-        lines, and processes each line using the provided ProcessData instance.
+        The files are processed in parallel by a pool of worker processes, each one
+        streaming and indexing a single file straight from the archive. The partial
+        results are merged into the provided ProcessData instance in archive order, and
+        only a bounded number of files is in flight so memory stays flat on large archives.
 
         Parameters:
             process_data (ProcessData): The data processor to handle the file content.
         """
-        with zipfile.ZipFile(self.zip_file, 'r') as zip_ref:
+        workers = os.cpu_count() or 1
+        pending = deque()
+
+        with zipfile.ZipFile(self.zip_file, 'r') as zip_ref, \
+                ProcessPoolExecutor(workers, initializer=open_archive, initargs=(self.zip_file,)) as executor:
             for file_info in zip_ref.infolist():
                 if not file_info.is_dir() and file_info.filename.endswith('.txt'):
-                    with zip_ref.open(file_info) as file:
-                        file_content = file.read().decode('utf-8')
-                        rows = file_content.splitlines()
-                        process_data.process(rows, file_info.filename)
+                    pending.append(executor.submit(process_file, file_info.filename))
+                    if len(pending) > 2 * workers:
+                        process_data.merge(pending.popleft().result())
+
+            while pending:
+                process_data.merge(pending.popleft().result())